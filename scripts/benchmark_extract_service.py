@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF图片提取服务 - 压测与回归基准
+
+无需 GPU / MinerU 模型即可测量 image_extract_service 的吞吐与延迟:
+- 使用 PyMuPDF 生成合成论文 PDF (图片、图注、长参考文献)
+- 用确定性的本地替身替换 mineru_main, 直接由 PDF 生成 markdown 与图片
+- 分阶段计时: extract_images_from_markdown / JSON 序列化 / HTTP /extract
+- 输出 p50/p95/p99 延迟、吞吐、峰值 RSS、响应字节数, 并可保存/对比基线
+
+用法:
+    python benchmark_extract_service.py --requests 40 --concurrency 4
+    python benchmark_extract_service.py --save-baseline bench_baseline.json
+    python benchmark_extract_service.py --compare bench_baseline.json --tolerance 0.25
+"""
+
+import sys
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import http.client
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+try:
+    import fitz  # PyMuPDF - 生成合成 PDF / 替身解析
+except ImportError:
+    print("PyMuPDF not installed. Please run: pip install PyMuPDF", file=sys.stderr)
+    sys.exit(1)
+
+import image_extract_service as service
+
+# 数值越大越差的指标; 其余 (吞吐) 越小越差
+LOWER_IS_BETTER = (
+    'markdown_ms_median',
+    'serialize_ms_median',
+    'http_p50_ms',
+    'http_p95_ms',
+    'http_p99_ms',
+    'peak_rss_mb',
+)
+HIGHER_IS_BETTER = ('http_throughput_rps',)
+
+
+# ---------------------------------------------------------------------------
+# 合成 PDF
+# ---------------------------------------------------------------------------
+
+def _synthetic_pixmap(rng: random.Random, width: int, height: int) -> 'fitz.Pixmap':
+    """生成带噪声的渐变图 (噪声使 PNG 难以压缩, 接近真实图表体积)"""
+    base = [rng.randrange(256) for _ in range(3)]
+    row_bytes = bytearray()
+    samples = bytearray()
+    for y in range(height):
+        row_bytes.clear()
+        for x in range(width):
+            noise = rng.getrandbits(5)
+            row_bytes.append((base[0] + x + noise) & 0xFF)
+            row_bytes.append((base[1] + y + noise) & 0xFF)
+            row_bytes.append((base[2] + x + y) & 0xFF)
+        samples += row_bytes
+    return fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), False)
+
+
+def generate_synthetic_pdf(
+    pdf_path: Path,
+    seed: int,
+    figures: int = 4,
+    references: int = 120,
+    image_size: int = 320
+) -> Path:
+    """
+    生成一篇合成论文 PDF
+
+    每个图片占一页, 图片下方是 "Figure N. ..." 图注, 正文中引用图号;
+    末尾附长参考文献部分, 用于覆盖参考文献检测分支.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    page = doc.new_page()
+    page.insert_textbox(
+        fitz.Rect(72, 72, 540, 200),
+        f"Synthetic Paper {seed}: Benchmarking Figure Extraction\n\n"
+        "Abstract. This document is generated for load testing. "
+        "See Figure 1 for an overview of the method.",
+        fontsize=11
+    )
+
+    for fig_num in range(1, figures + 1):
+        page = doc.new_page()
+        pix = _synthetic_pixmap(rng, image_size, int(image_size * 0.75))
+        page.insert_image(fitz.Rect(72, 72, 540, 72 + 468 * 0.75), pixmap=pix)
+        page.insert_textbox(
+            fitz.Rect(72, 440, 540, 520),
+            f"Figure {fig_num}. Synthetic result panel {fig_num} with "
+            f"{rng.randint(2, 6)} sub-plots and error bars.",
+            fontsize=10
+        )
+        page.insert_textbox(
+            fitz.Rect(72, 540, 540, 760),
+            f"As shown in Figure {fig_num}, the proposed method improves the "
+            f"baseline by {rng.uniform(1, 20):.1f}% on all benchmarks.",
+            fontsize=11
+        )
+
+    # 长参考文献部分
+    lines = ["References"] + [
+        f"[{k}] Author{k} A., Writer B. Synthetic study number {k}. "
+        f"Journal of Benchmarks {rng.randint(1, 60)}, {rng.randint(1, 999)} ({rng.randint(1990, 2025)})."
+        for k in range(1, references + 1)
+    ]
+    per_page = 40
+    for start in range(0, len(lines), per_page):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(54, 54, 558, 788),
+            "\n".join(lines[start:start + per_page]),
+            fontsize=8
+        )
+
+    doc.save(str(pdf_path), deflate=True)
+    doc.close()
+    return pdf_path
+
+
+# ---------------------------------------------------------------------------
+# MinerU 替身
+# ---------------------------------------------------------------------------
+
+def _argv_value(argv: List[str], flag: str) -> Optional[str]:
+    if flag in argv:
+        idx = argv.index(flag)
+        if idx + 1 < len(argv):
+            return argv[idx + 1]
+    return None
+
+
+def standin_mineru_main():
+    """
+    确定性的 mineru_main 替身
+
+    与 MinerU CLI 一样从 sys.argv 读取 -p/-o, 在 <o>/<stem>/auto/ 下写出
+    <stem>.md 与 images/, 并以 SystemExit(0) 结束.
+    """
+    pdf_path = _argv_value(sys.argv, '-p')
+    output_root = _argv_value(sys.argv, '-o')
+    if not pdf_path or not output_root:
+        raise SystemExit(2)
+
+    stem = Path(pdf_path).stem
+    auto_dir = Path(output_root) / stem / 'auto'
+    images_dir = auto_dir / 'images'
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    md_lines = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_index, page in enumerate(doc, start=1):
+            image_index = 0
+            for block in page.get_text('dict')['blocks']:
+                if block.get('type') == 1:
+                    image_index += 1
+                    filename = f"page_{page_index}_{image_index}.{block.get('ext', 'png')}"
+                    (images_dir / filename).write_bytes(block['image'])
+                    md_lines.append(f"![](images/{filename})")
+                    md_lines.append("")
+                else:
+                    for line in block.get('lines', []):
+                        text = ''.join(span['text'] for span in line['spans']).strip()
+                        if text:
+                            md_lines.append(text)
+                    md_lines.append("")
+    finally:
+        doc.close()
+
+    (auto_dir / f"{stem}.md").write_text('\n'.join(md_lines), encoding='utf-8')
+    raise SystemExit(0)
+
+
+def install_standin():
+    """将服务中的 MinerU 入口替换为替身"""
+    service.mineru_main = standin_mineru_main
+    service.MINERU_AVAILABLE = True
+
+
+# ---------------------------------------------------------------------------
+# 统计
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """线性插值百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值 RSS (MB), 平台不支持时返回 None"""
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB, macOS 为字节
+        return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 各阶段基准
+# ---------------------------------------------------------------------------
+
+def bench_markdown(pdf_paths: List[Path], work_dir: Path, iterations: int) -> Dict:
+    """单独计时 extract_images_from_markdown 与 JSON 序列化"""
+    extractor = service.MinerUImageExtractor()
+    markdown_ms = []
+    serialize_ms = []
+
+    for pdf_path in pdf_paths:
+        markdown_dir, markdown_content = extractor.parse_pdf_with_mineru(str(pdf_path))
+        for i in range(iterations):
+            out_dir = work_dir / 'markdown' / f"{pdf_path.stem}_{i}"
+            start = time.perf_counter()
+            figures = extractor.extract_images_from_markdown(markdown_content, markdown_dir, out_dir)
+            markdown_ms.append((time.perf_counter() - start) * 1000)
+
+            result = {'figures': figures, 'first_page': None, 'metadata': {}}
+            start = time.perf_counter()
+            service.encode_json_response(service.build_success_response(result))
+            serialize_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'markdown_ms_median': percentile(markdown_ms, 50),
+        'serialize_ms_median': percentile(serialize_ms, 50),
+    }
+
+
+def _post_extract(
+    conn: http.client.HTTPConnection,
+    pdf_path: Path,
+    output_dir: Path,
+    accept_encoding: Optional[str]
+) -> Dict:
+    body = json.dumps({'pdfPath': str(pdf_path), 'outputDir': str(output_dir)}).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if accept_encoding:
+        headers['Accept-Encoding'] = accept_encoding
+
+    start = time.perf_counter()
+    conn.request('POST', '/extract', body=body, headers=headers)
+    resp = conn.getresponse()
+    payload = resp.read()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        'status': resp.status,
+        'latency_ms': elapsed_ms,
+        'bytes': len(payload),
+        'encoding': resp.getheader('Content-Encoding') or 'identity',
+    }
+
+
+def bench_http(
+    pdf_paths: List[Path],
+    work_dir: Path,
+    total_requests: int,
+    concurrency: int,
+    keepalive: bool = True,
+    accept_encoding: Optional[str] = None
+) -> Dict:
+    """启动真实服务实例, 以给定并发驱动 /extract"""
+    server = service.create_server(0, host='127.0.0.1')
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # keep-alive 模式下每个客户端线程复用一条连接
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def connect() -> http.client.HTTPConnection:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+        with connections_lock:
+            connections.append(conn)
+        return conn
+
+    def run(i: int) -> Dict:
+        pdf_path = pdf_paths[i % len(pdf_paths)]
+        output_dir = work_dir / 'http' / f"req_{i}"
+        if keepalive and getattr(local, 'conn', None) is None:
+            local.conn = connect()
+        conn = local.conn if keepalive else connect()
+        try:
+            return _post_extract(conn, pdf_path, output_dir, accept_encoding)
+        except (OSError, http.client.HTTPException) as e:
+            # 传输错误计入失败; 长连接已不可用, 下次请求重新建立
+            print(f"[WARN] 请求 {i} 失败: {e!r}", file=sys.__stderr__)
+            conn.close()
+            local.conn = None
+            return {'status': None, 'latency_ms': None, 'bytes': 0, 'encoding': 'error'}
+        finally:
+            if not keepalive:
+                conn.close()
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(run, range(total_requests)))
+        wall_s = time.perf_counter() - start
+    finally:
+        for conn in connections:
+            conn.close()
+        server.shutdown()
+        server.server_close()
+
+    failures = [r for r in results if r['status'] != 200]
+    # 延迟统计只包含成功的请求
+    latencies = [r['latency_ms'] for r in results if r['status'] == 200]
+    return {
+        'http_requests': total_requests,
+        'http_failures': len(failures),
+        'http_p50_ms': percentile(latencies, 50),
+        'http_p95_ms': percentile(latencies, 95),
+        'http_p99_ms': percentile(latencies, 99),
+        'http_throughput_rps': total_requests / wall_s if wall_s > 0 else 0.0,
+        'http_bytes_total': sum(r['bytes'] for r in results),
+        'http_bytes_mean': sum(r['bytes'] for r in results) / len(results) if results else 0.0,
+        'http_connections': len(connections),
+        'http_encodings': sorted({r['encoding'] for r in results if r['status'] == 200}),
+    }
+
+
+# ---------------------------------------------------------------------------
+# 基线
+# ---------------------------------------------------------------------------
+
+def compare_with_baseline(metrics: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """返回超出容差的回归项描述"""
+    regressions = []
+    for key in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        old = baseline.get(key)
+        new = metrics.get(key)
+        if old is None or new is None or old <= 0:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if key in LOWER_IS_BETTER else change < -tolerance
+        if worse:
+            regressions.append(f"{key}: {old:.2f} -> {new:.2f} ({change:+.1%})")
+
+    # 合成输入是确定性的, 响应体积变化意味着输出格式或内容发生了变化
+    old_bytes = baseline.get('http_bytes_mean')
+    new_bytes = metrics.get('http_bytes_mean')
+    if old_bytes and new_bytes and abs(new_bytes - old_bytes) / old_bytes > tolerance:
+        regressions.append(f"http_bytes_mean: {old_bytes:.0f} -> {new_bytes:.0f}")
+    return regressions
+
+
+def print_report(metrics: Dict):
+    print("=" * 60)
+    print("PDF 图片提取服务 - 基准结果")
+    print("=" * 60)
+    print(f"  extract_images_from_markdown: {metrics['markdown_ms_median']:.2f} ms/次")
+    print(f"  JSON 序列化:                  {metrics['serialize_ms_median']:.2f} ms/次")
+    print(f"  HTTP 请求数:   {metrics['http_requests']} (失败 {metrics['http_failures']}, 并发 {metrics['concurrency']})")
+    print(f"  HTTP p50/p95/p99: {metrics['http_p50_ms']:.1f} / {metrics['http_p95_ms']:.1f} / {metrics['http_p99_ms']:.1f} ms")
+    print(f"  吞吐:          {metrics['http_throughput_rps']:.2f} req/s")
+    print(f"  响应字节:      {metrics['http_bytes_total']} 总计, {metrics['http_bytes_mean']:.0f} 平均 ({', '.join(metrics['http_encodings'])})")
+    print(f"  TCP 连接数:    {metrics['http_connections']}")
+    rss = metrics.get('peak_rss_mb')
+    print(f"  峰值 RSS:      {f'{rss:.1f} MB' if rss is not None else 'N/A'}")
+    print("=" * 60)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="PDF 图片提取服务压测与回归基准")
+    parser.add_argument('--pdfs', type=int, default=3, help="合成 PDF 数量")
+    parser.add_argument('--figures', type=int, default=4, help="每个 PDF 的图片数")
+    parser.add_argument('--references', type=int, default=120, help="每个 PDF 的参考文献条数")
+    parser.add_argument('--image-size', type=int, default=320, help="合成图片宽度 (像素)")
+    parser.add_argument('--requests', type=int, default=20, help="HTTP 请求总数")
+    parser.add_argument('--concurrency', type=int, default=4, help="HTTP 并发客户端数")
+    parser.add_argument('--accept-encoding', help="请求的 Accept-Encoding, 例如 gzip 或 zstd, gzip (默认不压缩)")
+    parser.add_argument('--no-keepalive', action='store_true', help="每个请求新建 TCP 连接")
+    parser.add_argument('--iterations', type=int, default=10, help="markdown 阶段每个 PDF 的重复次数")
+    parser.add_argument('--work-dir', help="工作目录 (默认使用临时目录并在结束后删除)")
+    parser.add_argument('--save-baseline', metavar='PATH', help="将结果保存为基线 JSON")
+    parser.add_argument('--compare', metavar='PATH', help="与基线 JSON 对比, 出现回归时退出码为 1")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="回归容差 (相对变化, 默认 0.25)")
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出结果")
+    parser.add_argument('--verbose', action='store_true', help="保留服务的 stderr 日志")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    install_standin()
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix='extract_bench_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    pdf_dir = work_dir / 'pdfs'
+    pdf_dir.mkdir(exist_ok=True)
+
+    # 服务在每次请求中输出大量调试日志, 默认屏蔽以免干扰计时
+    log_sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stderr(io.StringIO())
+
+    try:
+        pdf_paths = [
+            generate_synthetic_pdf(
+                pdf_dir / f"synthetic_{i}.pdf",
+                seed=i,
+                figures=args.figures,
+                references=args.references,
+                image_size=args.image_size
+            )
+            for i in range(args.pdfs)
+        ]
+
+        with log_sink:
+            metrics = bench_markdown(pdf_paths, work_dir, args.iterations)
+            metrics.update(bench_http(
+                pdf_paths,
+                work_dir,
+                args.requests,
+                args.concurrency,
+                keepalive=not args.no_keepalive,
+                accept_encoding=args.accept_encoding
+            ))
+
+        metrics['concurrency'] = args.concurrency
+        metrics['peak_rss_mb'] = peak_rss_mb()
+        metrics['config'] = {
+            'pdfs': args.pdfs,
+            'figures': args.figures,
+            'references': args.references,
+            'image_size': args.image_size,
+            'requests': args.requests,
+            'iterations': args.iterations,
+            'keepalive': not args.no_keepalive,
+            'accept_encoding': args.accept_encoding,
+        }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(metrics, ensure_ascii=False, indent=2))
+    else:
+        print_report(metrics)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"[INFO] 基线已保存: {args.save_baseline}")
+
+    if metrics['http_failures']:
+        print(f"[ERROR] {metrics['http_failures']} 个 HTTP 请求失败", file=sys.stderr)
+        return 1
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        if baseline.get('config') != metrics['config']:
+            print("[WARN] 基线配置与本次运行不一致, 对比结果仅供参考", file=sys.stderr)
+        regressions = compare_with_baseline(metrics, baseline, args.tolerance)
+        if regressions:
+            print("[ERROR] 检测到性能回归:", file=sys.stderr)
+            for item in regressions:
+                print(f"  - {item}", file=sys.stderr)
+            return 1
+        print(f"[INFO] 与基线对比通过 (容差 {args.tolerance:.0%})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
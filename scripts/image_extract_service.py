@@ -9,11 +9,18 @@ import sys
 import json
 import os
 import base64
+import io
 import re
 import tempfile
 import shutil
+import hashlib
+import threading
+import time
+import queue
+import gzip
+from collections import OrderedDict
 from pathlib import Path
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from typing import List, Dict, Optional, Tuple
 
 try:
@@ -33,6 +40,16 @@ except ImportError:
     mineru_version = None
     print("[WARN] MinerU 未安装或导入失败，将使用基础模式", file=sys.stderr)
 
+try:
+    from PIL import Image  # Pillow - 页面渲染输出的缩放与编码
+except ImportError:
+    Image = None
+
+try:
+    import zstandard  # 可选：响应 zstd 压缩
+except ImportError:
+    zstandard = None
+
 # 配置项
 MINERU_BACKEND = (os.environ.get('MINERU_BACKEND') or 'pipeline').strip()  # pipeline | vlm-transformers
 MINERU_LANG = (os.environ.get('MINERU_LANG') or 'en').strip()  # ch | en
@@ -41,6 +58,34 @@ MINERU_DPI = int(os.environ.get('MINERU_DPI', '300'))
 MINERU_PARSE_FORMULA = os.environ.get('MINERU_PARSE_FORMULA', '1') == '1'
 MINERU_PARSE_TABLE = os.environ.get('MINERU_PARSE_TABLE', '1') == '1'
 
+# 目录监听 (预处理) 配置：WATCH_DIR 为空时不启用
+WATCH_DIR = (os.environ.get('WATCH_DIR') or '').strip()  # 例如 ../pdfs
+WATCH_INTERVAL = float(os.environ.get('WATCH_INTERVAL', '5'))  # 轮询间隔 (秒)
+WATCH_DEBOUNCE = float(os.environ.get('WATCH_DEBOUNCE', '10'))  # 文件大小/修改时间稳定多久后才处理 (秒)
+WATCH_CACHE_DIR = (os.environ.get('WATCH_CACHE_DIR') or '').strip()  # 预处理结果目录，默认临时目录
+WATCH_CACHE_SIZE = int(os.environ.get('WATCH_CACHE_SIZE', '32'))  # 内存中保留的结果数
+WATCH_PROCESS_EXISTING = os.environ.get('WATCH_PROCESS_EXISTING', '0') == '1'  # 启动时是否预处理目录中已有的 PDF
+
+# 页面渲染缓存：按 (PDF 哈希, 页码) 保留的渲染数，以及解码后位图的总内存上限
+RENDER_CACHE_SIZE = int(os.environ.get('RENDER_CACHE_SIZE', '8'))
+RENDER_CACHE_MAX_MB = float(os.environ.get('RENDER_CACHE_MAX_MB', '64'))  # 超出上限的单个渲染不缓存
+# /render 未指定 outputs 时的默认输出：公众号封面 (2.35:1)、缩略图、整页
+DEFAULT_RENDER_OUTPUTS = [
+    {'name': 'cover', 'width': 900, 'height': 383, 'fit': 'cover', 'format': 'jpeg', 'quality': 85},
+    {'name': 'thumbnail', 'width': 200, 'format': 'jpeg', 'quality': 80},
+    {'name': 'page', 'dpi': 150, 'format': 'png'},
+]
+
+# HTTP 连接与响应压缩配置
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', '30'))  # 空闲长连接保持时间 (秒)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))  # 小于该大小的响应不压缩
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_ZSTD_LEVEL = int(os.environ.get('COMPRESS_ZSTD_LEVEL', '3'))
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', str(1024 * 1024)))  # 请求体上限 (JSON 参数很小)
+
+# mineru_main 依赖全局 sys.argv，前台请求与后台预处理共用此锁串行调用
+_MINERU_LOCK = threading.Lock()
+
 # 图片匹配相关正则
 FIG_REGEX = re.compile(
     r'(fig(?:ure)?|extended\s+data\s+fig|supplementary\s+fig|图)\.?\s*(?:\d+\s*[a-z]?)(?:\s*[-:|])?',
@@ -102,6 +147,9 @@ def extract_first_page_simple(pdf_path: str, output_dir: str, dpi: int = 300) ->
     """
     使用 PyMuPDF 快速提取第一页
 
+    安装 Pillow 时通过 render_page_outputs 渲染 (可复用 /render 的渲染缓存，但不写入)，
+    否则直接由 PyMuPDF 保存 PNG；均不依赖 cv2 / numpy。
+
     Returns:
         第一页信息字典或None
     """
@@ -109,30 +157,29 @@ def extract_first_page_simple(pdf_path: str, output_dir: str, dpi: int = 300) ->
         return None
 
     try:
-        import cv2
-        import numpy as np
-    except ImportError:
-        return None
-
-    try:
-        doc = fitz.open(pdf_path)
-        if len(doc) == 0:
-            doc.close()
-            return None
-
-        page = doc[0]
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-
-        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
-        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-
-        output_path = Path(output_dir) / "page_1.png"
-        cv2.imwrite(str(output_path), img)
-
-        doc.close()
-
-        base64_data, mime_type = encode_image_to_base64(output_path)
+        if Image is not None:
+            # /extract 的结果本身已按哈希缓存，不必再把整页高 DPI 渲染留在渲染缓存中
+            rendered = render_page_outputs(
+                pdf_path,
+                output_dir,
+                [{'name': 'page_1', 'dpi': dpi, 'format': 'png'}],
+                store_render=False
+            )
+            page_1 = rendered['outputs']['page_1']
+            output_path = Path(page_1['path'])
+            base64_data, mime_type = page_1['base64_data'], page_1['mime_type']
+        else:
+            doc = fitz.open(pdf_path)
+            try:
+                if len(doc) == 0:
+                    return None
+                pix = doc[0].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+                output_path = Path(output_dir) / "page_1.png"
+                pix.save(str(output_path))
+            finally:
+                doc.close()
+            base64_data, mime_type = encode_image_to_base64(output_path)
 
         return {
             'page': 1,
@@ -152,11 +199,13 @@ class MinerUImageExtractor:
     使用 MinerU 的图像提取器
     """
 
-    def __init__(self, backend: str = 'pipeline', lang: str = 'en', device: str = 'cpu'):
+    def __init__(self, backend: str = 'pipeline', lang: str = 'en', device: str = 'cpu', background_gate=None):
         self.backend = backend
         self.lang = lang
         self.device = device
         self.temp_dirs = []
+        # 后台预处理时传入 PrecomputeCache：有前台请求等待 MinerU 时让出
+        self.background_gate = background_gate
 
     def __del__(self):
         """清理临时目录"""
@@ -167,6 +216,21 @@ class MinerUImageExtractor:
             except Exception as e:
                 print(f"[WARN] 清理临时目录失败: {e}", file=sys.stderr)
 
+    def _acquire_mineru_lock(self):
+        """
+        获取 MinerU 锁
+
+        后台任务拿到锁后若发现有前台请求正在等待 MinerU，则释放锁并等到前台空闲再重试，
+        避免前台请求排在一次 3-5 分钟的后台解析之后。已经开始的解析不会被中断。
+        """
+        while True:
+            _MINERU_LOCK.acquire()
+            if self.background_gate is None or not self.background_gate.foreground_busy():
+                return
+            _MINERU_LOCK.release()
+            print("[INFO] 有前台请求等待 MinerU，后台预处理让出", file=sys.stderr)
+            self.background_gate.wait_until_idle()
+
     def parse_pdf_with_mineru(self, pdf_path: str) -> Tuple[Path, str]:
         """
         使用 MinerU 解析 PDF
@@ -174,9 +238,11 @@ class MinerUImageExtractor:
         Returns:
             (markdown_dir, markdown_content)
         """
-        from mineru.cli.client import main as mineru_main
         import sys as _sys
 
+        if mineru_main is None:
+            raise RuntimeError("MinerU 未安装")
+
         # 创建临时输出目录
         output_dir = Path(tempfile.mkdtemp(prefix='mineru_'))
         self.temp_dirs.append(output_dir)
@@ -184,33 +250,39 @@ class MinerUImageExtractor:
         print(f"[INFO] MinerU 解析中: {pdf_path}", file=sys.stderr)
         print(f"[INFO] 输出目录: {output_dir}", file=sys.stderr)
 
-        # 构建命令行参数
-        original_argv = _sys.argv.copy()
+        # 与其他请求 / 后台预处理串行调用 MinerU
+        self._acquire_mineru_lock()
         try:
-            _sys.argv = [
-                'mineru',
-                '-p', pdf_path,
-                '-o', str(output_dir),
-                '-b', self.backend,
-                '-l', self.lang,
-                '-d', self.device,
-                '-f', 'True' if MINERU_PARSE_FORMULA else 'False',
-                '-t', 'True' if MINERU_PARSE_TABLE else 'False'
-            ]
-
-            # 调用 MinerU
+            # 构建命令行参数
+            original_argv = _sys.argv.copy()
             try:
-                mineru_main()
-            except SystemExit as e:
-                # mineru_main 是 CLI 入口，正常结束会触发 SystemExit(0)
-                if e.code not in (0, None):
-                    print(f"[ERROR] MinerU 进程非零退出: {e}", file=sys.stderr)
-                    raise
-                else:
-                    print(f"[INFO] MinerU 正常退出 (SystemExit {e.code})，继续处理输出", file=sys.stderr)
-
+                _sys.argv = [
+                    'mineru',
+                    '-p', pdf_path,
+                    '-o', str(output_dir),
+                    '-b', self.backend,
+                    '-l', self.lang,
+                    '-d', self.device,
+                    '-f', 'True' if MINERU_PARSE_FORMULA else 'False',
+                    '-t', 'True' if MINERU_PARSE_TABLE else 'False'
+                ]
+
+                # 调用 MinerU
+                try:
+                    mineru_main()
+                except SystemExit as e:
+                    # mineru_main 是 CLI 入口，正常结束会触发 SystemExit(0)
+                    if e.code not in (0, None):
+                        print(f"[ERROR] MinerU 进程非零退出: {e}", file=sys.stderr)
+                        # 转为普通异常，避免 SystemExit 结束请求线程或后台预处理线程
+                        raise RuntimeError(f"MinerU 非零退出 (SystemExit {e.code})") from e
+                    else:
+                        print(f"[INFO] MinerU 正常退出 (SystemExit {e.code})，继续处理输出", file=sys.stderr)
+
+            finally:
+                _sys.argv = original_argv
         finally:
-            _sys.argv = original_argv
+            _MINERU_LOCK.release()
 
         # 查找生成的 markdown 文件
         print(f"[INFO] 查找 markdown 文件...", file=sys.stderr)
@@ -506,18 +578,775 @@ class MinerUImageExtractor:
         }
 
 
+def run_extraction(pdf_path: str, output_dir: str, background_gate=None) -> Dict:
+    """
+    执行一次完整提取 (MinerU 不可用时降级为仅提取第一页)
+
+    background_gate 仅由后台预处理传入，见 MinerUImageExtractor._acquire_mineru_lock
+
+    Returns:
+        与 MinerUImageExtractor.extract_images 相同结构的结果
+    """
+    if MINERU_AVAILABLE:
+        extractor = MinerUImageExtractor(
+            backend=MINERU_BACKEND,
+            lang=MINERU_LANG,
+            device=MINERU_DEVICE,
+            background_gate=background_gate
+        )
+        return extractor.extract_images(pdf_path, output_dir)
+
+    # 降级到基础模式
+    first_page = extract_first_page_simple(pdf_path, output_dir)
+    return {
+        'figures': [],
+        'first_page': first_page,
+        'metadata': {'error': 'MinerU not available'}
+    }
+
+
+def compute_file_hash(path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"PDF文件不存在: {path}")
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# 页面渲染 (封面 / 缩略图 / 整页)
+# ---------------------------------------------------------------------------
+
+RENDER_FORMATS = {
+    'png': ('PNG', 'png', 'image/png'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'jpg': ('JPEG', 'jpg', 'image/jpeg'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+}
+RENDER_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+RENDER_MAX_PIXELS = 4096  # 输出宽/高上限
+RENDER_MAX_DPI = max(300, MINERU_DPI)  # 整页输出 DPI 上限 (不低于第一页提取所用的 DPI)
+RENDER_MAX_AREA = 40_000_000  # 单次渲染位图的像素数上限 (RGB 约 120 MB)
+
+# PyMuPDF 文档对象不是线程安全的，渲染与缓存读写共用此锁
+_RENDER_LOCK = threading.Lock()
+# (pdf_hash, page_index) -> {'scale', 'image', 'page_size'}
+_RENDER_CACHE: 'OrderedDict[Tuple[str, int], Dict]' = OrderedDict()
+
+
+def parse_render_outputs(specs: List[Dict]) -> List[Dict]:
+    """
+    校验并规范化渲染输出配置
+
+    每项支持:
+    - name: 输出名称 (同时作为文件名)
+    - width / height: 目标尺寸，只给一个时按比例缩放
+    - fit: cover (裁剪填满，默认) | contain (完整放入)，仅在同时给出 width 和 height 时有效
+    - anchor: top (默认) | center，cover 裁剪时保留的区域
+    - dpi: 未给出尺寸时按 DPI 渲染整页，默认 MINERU_DPI
+    - format: png (默认) | jpeg | webp
+    - quality: jpeg / webp 质量，默认 85
+
+    Raises:
+        ValueError: 配置非法
+    """
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("outputs 必须是非空数组")
+
+    outputs = []
+    seen_names = set()
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError(f"输出配置必须是对象: {spec!r}")
+
+        name = str(spec.get('name', ''))
+        if not RENDER_NAME_PATTERN.match(name):
+            raise ValueError(f"输出名称非法 (仅允许字母、数字、_、-): {name!r}")
+        if name in seen_names:
+            raise ValueError(f"输出名称重复: {name}")
+        seen_names.add(name)
+
+        fmt = str(spec.get('format', 'png')).lower()
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"{name}: 不支持的格式 {fmt}")
+
+        try:
+            width = int(spec['width']) if spec.get('width') is not None else None
+            height = int(spec['height']) if spec.get('height') is not None else None
+            dpi = int(spec['dpi']) if spec.get('dpi') is not None else None
+            quality = int(spec.get('quality', 85))
+        except (TypeError, ValueError):
+            raise ValueError(f"{name}: width/height/dpi/quality 必须是整数")
+
+        for label, value in (('width', width), ('height', height)):
+            if value is not None and not 1 <= value <= RENDER_MAX_PIXELS:
+                raise ValueError(f"{name}: {label} 超出范围 1-{RENDER_MAX_PIXELS}")
+        if dpi is not None and not 1 <= dpi <= RENDER_MAX_DPI:
+            raise ValueError(f"{name}: dpi 超出范围 1-{RENDER_MAX_DPI}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"{name}: quality 超出范围 1-100")
+
+        fit = str(spec.get('fit', 'cover')).lower()
+        if fit not in ('cover', 'contain'):
+            raise ValueError(f"{name}: fit 必须是 cover 或 contain")
+        anchor = str(spec.get('anchor', 'top')).lower()
+        if anchor not in ('top', 'center'):
+            raise ValueError(f"{name}: anchor 必须是 top 或 center")
+
+        outputs.append({
+            'name': name,
+            'width': width,
+            'height': height,
+            'dpi': dpi if dpi is not None or width or height else MINERU_DPI,
+            'fit': fit,
+            'anchor': anchor,
+            'format': fmt,
+            'quality': quality,
+        })
+
+    return outputs
+
+
+def _output_geometry(spec: Dict, page_width: float, page_height: float) -> Tuple[float, Tuple[int, int], Optional[Tuple[int, int]]]:
+    """
+    计算单个输出所需的渲染比例 (像素/点)、缩放后尺寸与裁剪尺寸
+
+    Returns:
+        (scale, resized_size, crop_size 或 None)
+    """
+    width, height = spec['width'], spec['height']
+    if width and height:
+        fx, fy = width / page_width, height / page_height
+        scale = max(fx, fy) if spec['fit'] == 'cover' else min(fx, fy)
+    elif width:
+        scale = width / page_width
+    elif height:
+        scale = height / page_height
+    else:
+        scale = spec['dpi'] / 72
+
+    resized = (max(1, round(page_width * scale)), max(1, round(page_height * scale)))
+    crop = None
+    if width and height and spec['fit'] == 'cover':
+        # 四舍五入可能比目标小 1 像素，裁剪前补齐
+        resized = (max(resized[0], width), max(resized[1], height))
+        crop = (width, height)
+    return scale, resized, crop
+
+
+def _render_bytes(entry: Dict) -> int:
+    """缓存项中解码后 RGB 位图占用的字节数"""
+    image = entry['image']
+    return image.width * image.height * 3
+
+
+def _get_page_render(
+    pdf_path: str,
+    pdf_hash: str,
+    page_index: int,
+    outputs: List[Dict],
+    store: bool = True
+) -> Tuple[Dict, bool]:
+    """
+    取得满足所有输出的页面渲染，缓存中已有足够大的渲染时直接复用
+
+    store=False 时新渲染不写入缓存 (仍可命中已有缓存)
+
+    Returns:
+        (缓存项, 是否命中缓存)
+    """
+    key = (pdf_hash, page_index)
+    with _RENDER_LOCK:
+        entry = _RENDER_CACHE.get(key)
+        doc = None
+        try:
+            if entry is not None:
+                page_width, page_height = entry['page_size']
+            else:
+                doc = fitz.open(pdf_path)
+                if not 0 <= page_index < len(doc):
+                    raise ValueError(f"页码超出范围: {page_index + 1} (共 {len(doc)} 页)")
+                rect = doc[page_index].rect
+                page_width, page_height = rect.width, rect.height
+
+            # 最大输出所需的最低渲染比例
+            scale = max(_output_geometry(spec, page_width, page_height)[0] for spec in outputs)
+            if entry is not None and entry['scale'] >= scale:
+                _RENDER_CACHE.move_to_end(key)
+                return entry, True
+
+            # 细长页面配合 cover 等配置可能放大出极大的位图，渲染前拒绝
+            area = round(page_width * scale) * round(page_height * scale)
+            if area > RENDER_MAX_AREA:
+                raise ValueError(f"渲染尺寸过大: {area} 像素 (上限 {RENDER_MAX_AREA})")
+
+            if doc is None:
+                doc = fitz.open(pdf_path)
+            pix = doc[page_index].get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            entry = {
+                'scale': scale,
+                'image': Image.frombytes('RGB', (pix.width, pix.height), pix.samples),
+                'page_size': (page_width, page_height),
+            }
+        finally:
+            if doc is not None:
+                doc.close()
+
+        budget = RENDER_CACHE_MAX_MB * 1024 * 1024
+        if not store or _render_bytes(entry) > budget:
+            return entry, False
+
+        _RENDER_CACHE[key] = entry
+        _RENDER_CACHE.move_to_end(key)
+        # 按条数和位图总字节数淘汰最久未用的渲染
+        while (len(_RENDER_CACHE) > max(1, RENDER_CACHE_SIZE)
+               or sum(_render_bytes(e) for e in _RENDER_CACHE.values()) > budget):
+            _RENDER_CACHE.popitem(last=False)
+        return entry, False
+
+
+def render_page_outputs(
+    pdf_path: str,
+    output_dir: str,
+    specs: List[Dict],
+    page: int = 1,
+    store_render: bool = True
+) -> Dict:
+    """
+    一次渲染页面并生成多个命名输出 (如公众号封面、缩略图、整页)
+
+    页面只按最大输出所需的最低 DPI 渲染一次，各输出再由该渲染缩放/裁剪得到；
+    渲染结果按 PDF 内容哈希缓存，同一 PDF 的后续请求无需重新渲染
+    (store_render=False 时不写入缓存)。
+
+    Returns:
+        {
+            'page': 页码,
+            'render': {'dpi': ..., 'width': ..., 'height': ..., 'cached': bool},
+            'outputs': {name: {...}}
+        }
+    """
+    if not fitz:
+        raise RuntimeError("PyMuPDF 未安装")
+    if Image is None:
+        raise RuntimeError("Pillow 未安装，无法渲染页面")
+
+    outputs = parse_render_outputs(specs)
+    try:
+        page_index = int(page) - 1
+    except (TypeError, ValueError):
+        raise ValueError(f"页码非法: {page!r}")
+
+    pdf_hash = compute_file_hash(pdf_path)
+    entry, cached = _get_page_render(pdf_path, pdf_hash, page_index, outputs, store=store_render)
+    rendered = entry['image']
+    # 缓存的渲染可能比本次所需更大，目标尺寸始终按页面尺寸计算
+    page_width, page_height = entry['page_size']
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for spec in outputs:
+        _, resized_size, crop = _output_geometry(spec, page_width, page_height)
+
+        # 始终缩放到按页面尺寸计算的目标大小，保证相同配置的输出与缓存状态无关
+        image = rendered
+        if image.size != resized_size:
+            image = image.resize(resized_size, Image.LANCZOS, reducing_gap=3.0)
+        if crop:
+            left = (image.width - crop[0]) // 2
+            top = 0 if spec['anchor'] == 'top' else (image.height - crop[1]) // 2
+            image = image.crop((left, top, left + crop[0], top + crop[1]))
+
+        pil_format, ext, mime_type = RENDER_FORMATS[spec['format']]
+        save_kwargs = {'quality': spec['quality']} if pil_format in ('JPEG', 'WEBP') else {}
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=pil_format, **save_kwargs)
+        data = buffer.getvalue()
+
+        filename = f"{spec['name']}.{ext}"
+        file_path = output_path / filename
+        file_path.write_bytes(data)
+
+        results[spec['name']] = {
+            'path': str(file_path),
+            'filename': filename,
+            'base64_data': base64.b64encode(data).decode('utf-8'),
+            'mime_type': mime_type,
+            'width': image.width,
+            'height': image.height,
+            'bytes': len(data),
+        }
+
+    return {
+        'page': page_index + 1,
+        'render': {
+            'dpi': round(entry['scale'] * 72, 1),
+            'width': rendered.width,
+            'height': rendered.height,
+            'cached': cached,
+        },
+        'outputs': results,
+    }
+
+
+class PrecomputeCache:
+    """
+    按 PDF 内容哈希缓存提取结果，并在后台以低优先级预处理
+
+    - 结果统一写入 cache_root/<hash>/ (附 result.json 清单)，返回前复制到请求的 outputDir
+    - 重启时从 cache_root 中的清单恢复结果，已处理过的 PDF 无需再次运行 MinerU
+    - 同一 PDF 正在提取时，后到的请求等待其完成而不是重复提取
+    - 后台任务只在没有前台请求时开始，且有前台请求等待 MinerU 时不会抢先获取 MinerU 锁；
+      已经开始的后台解析不会被中断
+    """
+
+    MANIFEST_NAME = 'result.json'
+
+    def __init__(self, cache_root: Path, max_entries: int = 32):
+        self.cache_root = cache_root
+        self.cache_root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, max_entries)
+
+        self._results: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._active_requests = 0
+        # 自行提取 (而非等待他人结果) 的前台请求数
+        self._foreground_computing = 0
+        # 正在复制某个结果文件的请求数；被淘汰的结果在无人读取后才删除目录
+        self._readers: Dict[str, int] = {}
+        self._evicted = set()
+        self._cond = threading.Condition()
+        self._queue: 'queue.Queue[Tuple[str, str]]' = queue.Queue()
+
+        self._load_manifests()
+
+        self._worker = threading.Thread(target=self._background_worker, name='precompute-worker', daemon=True)
+        self._worker.start()
+
+    def contains(self, file_hash: str) -> bool:
+        """结果已缓存或正在提取"""
+        with self._cond:
+            return file_hash in self._results or file_hash in self._in_flight
+
+    def enqueue(self, pdf_path: str, file_hash: str):
+        """加入后台预处理队列"""
+        self._queue.put((pdf_path, file_hash))
+
+    def foreground_busy(self) -> bool:
+        """是否有前台请求正在提取 (等待或占用 MinerU)"""
+        with self._cond:
+            return self._foreground_computing > 0
+
+    def wait_until_idle(self):
+        """
+        阻塞直到没有前台请求在提取
+
+        不能等待 _active_requests 归零：前台请求可能正在等待这次后台任务的结果。
+        """
+        with self._cond:
+            while self._foreground_computing > 0:
+                self._cond.wait()
+
+    def get_or_extract(self, pdf_path: str, output_dir: str) -> Dict:
+        """前台请求入口：命中缓存则立即返回，否则提取并缓存"""
+        file_hash = compute_file_hash(pdf_path)
+
+        with self._cond:
+            self._active_requests += 1
+        try:
+            result = self._get_or_compute(pdf_path, file_hash)
+        finally:
+            with self._cond:
+                self._active_requests -= 1
+                self._cond.notify_all()
+
+        # _get_or_compute 返回时已登记读取，复制完成前目录不会被淘汰删除
+        try:
+            return self._materialize(result, output_dir)
+        finally:
+            self._release(file_hash)
+
+    def _get_or_compute(self, pdf_path: str, file_hash: str) -> Dict:
+        while True:
+            with self._cond:
+                cached = self._results.get(file_hash)
+                if cached is not None:
+                    self._results.move_to_end(file_hash)
+                    self._readers[file_hash] = self._readers.get(file_hash, 0) + 1
+                    print(f"[INFO] 命中预处理缓存: {pdf_path} ({file_hash[:12]})", file=sys.stderr)
+                    return cached
+
+                event = self._in_flight.get(file_hash)
+                if event is None:
+                    # 由当前线程负责提取
+                    self._in_flight[file_hash] = threading.Event()
+                    self._foreground_computing += 1
+                    break
+
+            # 完成后重新检查：若对方提取失败，由当前请求重新提取 (失败时把错误返回给调用方)
+            print(f"[INFO] 等待进行中的提取完成: {pdf_path} ({file_hash[:12]})", file=sys.stderr)
+            event.wait()
+
+        try:
+            return self._compute(pdf_path, file_hash, hold=True)
+        finally:
+            with self._cond:
+                self._foreground_computing -= 1
+                self._cond.notify_all()
+
+    def _compute(self, pdf_path: str, file_hash: str, background: bool = False, hold: bool = False) -> Dict:
+        """
+        提取到缓存目录；调用前必须已在 _in_flight 中登记
+
+        hold=True 时在登记结果的同时登记一次读取，调用方负责 _release
+        """
+        result = None
+        try:
+            target_dir = self.cache_root / file_hash
+            result = run_extraction(pdf_path, str(target_dir), background_gate=self if background else None)
+            self._save_manifest(file_hash, result)
+            return result
+        finally:
+            with self._cond:
+                if result is not None:
+                    self._store_locked(file_hash, result)
+                    if hold:
+                        self._readers[file_hash] = self._readers.get(file_hash, 0) + 1
+                event = self._in_flight.pop(file_hash)
+                event.set()
+                self._cond.notify_all()
+
+    def _store_locked(self, file_hash: str, result: Dict):
+        """登记结果并按 LRU 淘汰；调用方需持有 _cond"""
+        self._results[file_hash] = result
+        self._results.move_to_end(file_hash)
+        self._evicted.discard(file_hash)
+        while len(self._results) > self.max_entries:
+            evicted, _ = self._results.popitem(last=False)
+            if self._readers.get(evicted):
+                # 仍有请求在复制该结果，由最后一个读者删除
+                self._evicted.add(evicted)
+            else:
+                shutil.rmtree(self.cache_root / evicted, ignore_errors=True)
+
+    def _release(self, file_hash: str):
+        """结束一次读取；若结果已被淘汰且没有其他读者则删除目录"""
+        with self._cond:
+            remaining = self._readers.get(file_hash, 0) - 1
+            if remaining > 0:
+                self._readers[file_hash] = remaining
+                return
+            self._readers.pop(file_hash, None)
+            if file_hash in self._evicted and file_hash not in self._results:
+                self._evicted.discard(file_hash)
+                shutil.rmtree(self.cache_root / file_hash, ignore_errors=True)
+
+    def _save_manifest(self, file_hash: str, result: Dict):
+        """写出结果清单 (不含 base64，重启加载时从图片文件重新编码)"""
+        def strip(item: Optional[Dict]) -> Optional[Dict]:
+            if not item:
+                return item
+            return {k: v for k, v in item.items() if k != 'base64_data'}
+
+        manifest = {
+            'figures': [strip(fig) for fig in result['figures']],
+            'first_page': strip(result['first_page']),
+            'metadata': result.get('metadata', {})
+        }
+        try:
+            (self.cache_root / file_hash / self.MANIFEST_NAME).write_text(
+                json.dumps(manifest, ensure_ascii=False), encoding='utf-8'
+            )
+        except Exception as e:
+            print(f"[WARN] 写入预处理清单失败 {file_hash[:12]}: {e}", file=sys.stderr)
+
+    def _load_manifests(self):
+        """从 cache_root 恢复之前的预处理结果 (按修改时间保留最近的 max_entries 个)"""
+        manifests = sorted(
+            self.cache_root.glob(f'*/{self.MANIFEST_NAME}'),
+            key=lambda path: path.stat().st_mtime
+        )
+        for manifest_path in manifests:
+            entry_dir = manifest_path.parent
+            file_hash = entry_dir.name
+            try:
+                result = json.loads(manifest_path.read_text(encoding='utf-8'))
+
+                def restore(item: Optional[Dict]) -> Optional[Dict]:
+                    if not item:
+                        return item
+                    # 缓存目录可能被移动过，路径以当前 cache_root 为准
+                    image_path = entry_dir / item['filename']
+                    base64_data, mime_type = encode_image_to_base64(image_path)
+                    return dict(item, path=str(image_path), base64_data=base64_data, mime_type=mime_type)
+
+                result['figures'] = [restore(fig) for fig in result['figures']]
+                result['first_page'] = restore(result['first_page'])
+            except Exception as e:
+                print(f"[WARN] 预处理清单无效，已丢弃 {entry_dir}: {e}", file=sys.stderr)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+
+            with self._cond:
+                self._store_locked(file_hash, result)
+
+        if self._results:
+            print(f"[INFO] 从 {self.cache_root} 恢复 {len(self._results)} 个预处理结果", file=sys.stderr)
+
+    def _background_worker(self):
+        while True:
+            pdf_path, file_hash = self._queue.get()
+
+            # 低优先级：等待前台请求全部结束
+            with self._cond:
+                while self._active_requests > 0:
+                    self._cond.wait()
+                if file_hash in self._results or file_hash in self._in_flight:
+                    continue
+                self._in_flight[file_hash] = threading.Event()
+
+            print(f"[INFO] 后台预处理: {pdf_path} ({file_hash[:12]})", file=sys.stderr)
+            try:
+                result = self._compute(pdf_path, file_hash, background=True)
+                print(f"[INFO] 后台预处理完成: {pdf_path}, {len(result['figures'])} 张图片", file=sys.stderr)
+            except (Exception, SystemExit) as e:
+                # 单个任务失败不能结束 worker 线程，否则后续入队的 PDF 永远不会被处理
+                print(f"[WARN] 后台预处理失败 {pdf_path}: {e!r}", file=sys.stderr)
+
+    @staticmethod
+    def _materialize(result: Dict, output_dir: str) -> Dict:
+        """将缓存结果中的图片复制到请求的输出目录，并返回路径已改写的副本"""
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        def relocate(item: Optional[Dict]) -> Optional[Dict]:
+            if not item:
+                return item
+            item = dict(item)
+            src = Path(item['path'])
+            dst = output_path / item['filename']
+            if src.resolve() != dst.resolve():
+                try:
+                    shutil.copy2(src, dst)
+                    item['path'] = str(dst)
+                except Exception as e:
+                    print(f"[WARN] 复制缓存图片失败 {src}: {e}", file=sys.stderr)
+            return item
+
+        return {
+            'figures': [relocate(fig) for fig in result['figures']],
+            'first_page': relocate(result['first_page']),
+            'metadata': dict(result.get('metadata', {}))
+        }
+
+
+class PdfFolderWatcher(threading.Thread):
+    """
+    轮询监听 PDF 目录，将新增或修改的 PDF 加入后台预处理队列
+
+    文件大小与修改时间在 debounce 秒内保持不变才视为写入完成；
+    内容哈希已缓存 (或正在提取) 的文件会被跳过。
+    启动时目录中已有的 PDF 默认只记录不处理 (process_existing=True 时一并预处理)。
+    """
+
+    def __init__(
+        self,
+        watch_dir: str,
+        cache: PrecomputeCache,
+        interval: float = 5,
+        debounce: float = 10,
+        process_existing: bool = False
+    ):
+        super().__init__(name='pdf-folder-watcher', daemon=True)
+        self.watch_dir = Path(watch_dir)
+        self.cache = cache
+        self.interval = interval
+        self.debounce = debounce
+        self.process_existing = process_existing
+        self._baseline_scanned = False
+        # path -> (size, mtime, 首次观察到该签名的时间)
+        self._pending: Dict[str, Tuple[int, float, float]] = {}
+        # path -> 已处理的 (size, mtime)
+        self._handled: Dict[str, Tuple[int, float]] = {}
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        print(f"[INFO] 开始监听 PDF 目录: {self.watch_dir}", file=sys.stderr)
+        while not self._stop_event.is_set():
+            try:
+                self.scan_once()
+            except Exception as e:
+                print(f"[WARN] 扫描 PDF 目录失败: {e}", file=sys.stderr)
+            self._stop_event.wait(self.interval)
+
+    def scan_once(self, now: Optional[float] = None):
+        if now is None:
+            now = time.monotonic()
+        seen = set()
+
+        # 首次扫描：已有文件视为已处理，只有之后新增或修改的文件才会入队
+        baseline = not self._baseline_scanned and not self.process_existing
+        self._baseline_scanned = True
+
+        for entry in os.scandir(self.watch_dir):
+            if not entry.is_file() or not entry.name.lower().endswith('.pdf'):
+                continue
+            path = entry.path
+            seen.add(path)
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime)
+
+            if baseline:
+                self._handled[path] = signature
+                continue
+            if self._handled.get(path) == signature:
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[:2] != signature:
+                # 新文件或仍在写入：重新开始计时
+                self._pending[path] = (signature[0], signature[1], now)
+                continue
+            if now - pending[2] < self.debounce:
+                continue
+
+            del self._pending[path]
+            self._handled[path] = signature
+
+            try:
+                file_hash = compute_file_hash(path)
+            except Exception as e:
+                print(f"[WARN] 计算文件哈希失败 {path}: {e}", file=sys.stderr)
+                continue
+
+            if self.cache.contains(file_hash):
+                continue
+
+            print(f"[INFO] 检测到新 PDF，加入预处理队列: {path}", file=sys.stderr)
+            self.cache.enqueue(path, file_hash)
+
+        # 清理已删除文件的状态
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        for path in list(self._handled):
+            if path not in seen:
+                del self._handled[path]
+
+
+# 启用目录监听时由 main() 创建
+_precompute_cache: Optional[PrecomputeCache] = None
+
+
+def build_success_response(result: Dict) -> Dict:
+    """将提取结果组装为 /extract 的成功响应体"""
+    return {
+        'success': True,
+        'figures': result['figures'],
+        'first_page': result['first_page'],
+        'count': len(result['figures']),
+        'metadata': result.get('metadata', {})
+    }
+
+
+def encode_json_response(response: Dict) -> bytes:
+    """将响应体序列化为 UTF-8 JSON 字节"""
+    return json.dumps(response, ensure_ascii=False).encode('utf-8')
+
+
+def supported_encodings() -> List[str]:
+    """服务端支持的压缩编码，按优先级排列"""
+    return (['zstd'] if zstandard is not None else []) + ['gzip']
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩编码
+
+    支持 q 值 (q=0 表示拒绝) 与 "*" 通配符；客户端给出的 q 值相同时按服务端优先级选择.
+
+    Returns:
+        'zstd' / 'gzip'，不压缩时返回 None
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """按指定编码压缩响应体"""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+    if encoding == 'zstd':
+        # ZstdCompressor 不是线程安全的，每次调用新建
+        return zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compress(body)
+    raise ValueError(f"不支持的压缩编码: {encoding}")
+
+
+class RequestBodyError(Exception):
+    """请求体无法按 HTTP/1.1 规则完整读取；连接上剩余的字节不可信，必须关闭连接"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
 class ImageExtractHandler(BaseHTTPRequestHandler):
     """HTTP 请求处理器"""
 
+    # HTTP/1.1 长连接：每个响应都必须带 Content-Length
+    protocol_version = 'HTTP/1.1'
+    # 空闲连接超时后关闭，避免长连接长期占用处理线程
+    timeout = KEEPALIVE_TIMEOUT
+
     def do_POST(self):
-        if self.path != '/extract':
+        if self.path not in ('/extract', '/render'):
+            # 请求体未读取，无法在同一连接上继续解析下一个请求
+            self.close_connection = True
             self.send_error_response(404, "Endpoint not found")
             return
 
+        body_complete = False
         try:
-            # 读取请求
-            content_length = int(self.headers.get('Content-Length', 0))
-            body_bytes = self.rfile.read(content_length)
+            # 读取请求 (Content-Length 或 chunked)
+            try:
+                body_bytes = self.read_request_body()
+            except RequestBodyError as e:
+                self.close_connection = True
+                self.send_error_response(e.code, str(e))
+                return
+            body_complete = True
 
             # 解码
             try:
@@ -539,24 +1368,17 @@ class ImageExtractHandler(BaseHTTPRequestHandler):
                 self.send_error_response(400, "Missing pdfPath parameter")
                 return
 
+            if self.path == '/render':
+                self.handle_render(data, pdf_path, output_dir)
+                return
+
             print(f"[{self.log_date_time_string()}] 收到提取请求: {pdf_path}", file=sys.stderr)
 
-            # 执行提取
-            if MINERU_AVAILABLE:
-                extractor = MinerUImageExtractor(
-                    backend=MINERU_BACKEND,
-                    lang=MINERU_LANG,
-                    device=MINERU_DEVICE
-                )
-                result = extractor.extract_images(pdf_path, output_dir)
+            # 执行提取 (启用目录监听时优先使用预处理结果)
+            if _precompute_cache is not None:
+                result = _precompute_cache.get_or_extract(pdf_path, output_dir)
             else:
-                # 降级到基础模式
-                first_page = extract_first_page_simple(pdf_path, output_dir)
-                result = {
-                    'figures': [],
-                    'first_page': first_page,
-                    'metadata': {'error': 'MinerU not available'}
-                }
+                result = run_extraction(pdf_path, output_dir)
 
             # 返回成功响应
             self.send_success_response(result)
@@ -569,42 +1391,153 @@ class ImageExtractHandler(BaseHTTPRequestHandler):
             print(f"[{self.log_date_time_string()}] 提取失败: {e}", file=sys.stderr)
             import traceback
             traceback.print_exc()
+            if not body_complete:
+                # 请求体读取中途出错，连接上的剩余字节无法再解析
+                self.close_connection = True
             self.send_error_response(500, str(e))
 
+    def read_request_body(self) -> bytes:
+        """
+        按 HTTP/1.1 分帧规则完整读取请求体
+
+        Raises:
+            RequestBodyError: 分帧非法、超出 MAX_REQUEST_BYTES 或连接提前关闭
+        """
+        transfer_encoding = self.headers.get('Transfer-Encoding')
+        if transfer_encoding:
+            codings = [c.strip().lower() for c in transfer_encoding.split(',') if c.strip()]
+            if codings != ['chunked']:
+                raise RequestBodyError(501, f"Unsupported Transfer-Encoding: {transfer_encoding}")
+            if self.headers.get('Content-Length') is not None:
+                # 同时带 Content-Length 时以 chunked 为准，但响应后必须关闭连接 (RFC 7230 3.3.3)
+                self.close_connection = True
+            return self._read_chunked_body()
+
+        raw_length = self.headers.get('Content-Length')
+        if raw_length is None:
+            return b''
+        try:
+            content_length = int(raw_length)
+        except ValueError:
+            raise RequestBodyError(400, f"Invalid Content-Length: {raw_length!r}")
+        if content_length < 0:
+            raise RequestBodyError(400, f"Invalid Content-Length: {raw_length!r}")
+        if content_length > MAX_REQUEST_BYTES:
+            raise RequestBodyError(413, f"Request body too large: {content_length} bytes")
+
+        body = self.rfile.read(content_length)
+        if len(body) != content_length:
+            raise RequestBodyError(400, "Incomplete request body")
+        return body
+
+    def _read_chunked_body(self) -> bytes:
+        """解码 Transfer-Encoding: chunked 请求体 (忽略 chunk 扩展与 trailer)"""
+        chunks = []
+        total = 0
+        while True:
+            size_line = self.rfile.readline(1024)
+            if not size_line.endswith(b'\n'):
+                raise RequestBodyError(400, "Malformed chunk size line")
+            try:
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise RequestBodyError(400, f"Invalid chunk size: {size_line.strip()!r}")
+            if size < 0:
+                raise RequestBodyError(400, f"Invalid chunk size: {size_line.strip()!r}")
+            if size == 0:
+                break
+
+            total += size
+            if total > MAX_REQUEST_BYTES:
+                raise RequestBodyError(413, f"Request body too large: > {MAX_REQUEST_BYTES} bytes")
+            data = self.rfile.read(size)
+            if len(data) != size or self.rfile.readline(1024) not in (b'\r\n', b'\n'):
+                raise RequestBodyError(400, "Malformed chunk data")
+            chunks.append(data)
+
+        # trailer 部分，以空行结束
+        while True:
+            line = self.rfile.readline(8192)
+            if not line:
+                raise RequestBodyError(400, "Incomplete chunked body")
+            if line in (b'\r\n', b'\n'):
+                break
+        return b''.join(chunks)
+
+    def handle_render(self, data: Dict, pdf_path: str, output_dir: str):
+        """处理 /render：按 outputs 渲染页面的多个命名输出"""
+        outputs = data.get('outputs') or DEFAULT_RENDER_OUTPUTS
+        print(f"[{self.log_date_time_string()}] 收到渲染请求: {pdf_path} ({len(outputs)} 个输出)", file=sys.stderr)
+
+        try:
+            result = render_page_outputs(pdf_path, output_dir, outputs, page=data.get('page', 1))
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return
+
+        self.send_json_response(200, {'success': True, **result})
+
+        render = result['render']
+        print(
+            f"[{self.log_date_time_string()}] 渲染成功: {render['width']}x{render['height']} "
+            f"@ {render['dpi']} DPI ({'缓存' if render['cached'] else '新渲染'})",
+            file=sys.stderr
+        )
+
     def send_success_response(self, result: Dict):
         """发送成功响应"""
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.end_headers()
+        self.send_json_response(200, build_success_response(result))
 
+    def send_error_response(self, code: int, message: str):
+        """发送错误响应"""
         response = {
-            'success': True,
-            'figures': result['figures'],
-            'first_page': result['first_page'],
-            'count': len(result['figures']),
-            'metadata': result.get('metadata', {})
+            'success': False,
+            'error': message
         }
 
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.send_json_response(code, response)
+
+    def send_json_response(self, code: int, response: Dict):
+        """序列化、按需压缩并发送 JSON 响应"""
+        body = encode_json_response(response)
+
+        encoding = None
+        if len(body) >= COMPRESS_MIN_BYTES:
+            encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        if encoding:
+            raw_size = len(body)
+            # 每个连接有独立线程 (ThreadingHTTPServer)，在本线程内压缩不会阻塞其他客户端
+            body = compress_body(body, encoding)
+            print(f"[INFO] 响应压缩 ({encoding}): {raw_size} -> {len(body)} 字节", file=sys.stderr)
 
-    def send_error_response(self, code: int, message: str):
-        """发送错误响应"""
         self.send_response(code)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
         self.end_headers()
 
-        response = {
-            'success': False,
-            'error': message
-        }
-
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         """自定义日志"""
         sys.stderr.write(f"[{self.log_date_time_string()}] {format % args}\n")
 
 
+def create_server(port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """
+    创建 HTTP 服务实例 (main 与基准测试共用)
+
+    每个连接一个线程，长连接空闲时不会阻塞其他客户端；MinerU 调用由 _MINERU_LOCK 串行化.
+    """
+    server = ThreadingHTTPServer((host, port), ImageExtractHandler)
+    server.daemon_threads = True
+    return server
+
+
 def main():
     """启动 HTTP 服务"""
     port = int(os.environ.get('PORT', '3457'))
@@ -614,6 +1547,7 @@ def main():
     print("=" * 60)
     print(f"监听端口: {port}")
     print(f"API 地址: POST http://localhost:{port}/extract")
+    print(f"          POST http://localhost:{port}/render")
     print()
     print("MinerU 配置:")
     print(f"  - 可用状态: {'[YES] 已安装' if MINERU_AVAILABLE else '[NO] 未安装'}")
@@ -624,8 +1558,22 @@ def main():
     print(f"  - 公式解析: {'[YES]' if MINERU_PARSE_FORMULA else '[NO]'}")
     print(f"  - 表格解析: {'[YES]' if MINERU_PARSE_TABLE else '[NO]'}")
     print()
+    print("HTTP 配置:")
+    print(f"  - 长连接: HTTP/1.1 keep-alive, 空闲超时 {KEEPALIVE_TIMEOUT}s")
+    print(f"  - 响应压缩: {', '.join(supported_encodings())} (>= {COMPRESS_MIN_BYTES} 字节)")
+    print()
+    print("目录监听 (预处理):")
+    if WATCH_DIR:
+        print(f"  - 目录: {WATCH_DIR}")
+        print(f"  - 轮询间隔: {WATCH_INTERVAL}s, 防抖: {WATCH_DEBOUNCE}s")
+        print(f"  - 缓存上限: {WATCH_CACHE_SIZE} 个 PDF")
+        print(f"  - 预处理已有文件: {'[YES]' if WATCH_PROCESS_EXISTING else '[NO]'}")
+    else:
+        print("  - [NO] 未启用 (设置 WATCH_DIR 启用)")
+    print()
     print("请求格式:")
     print('  { "pdfPath": "...", "outputDir": "..." }')
+    print('  /render 另支持: { "page": 1, "outputs": [{ "name": "cover", "width": 900, "height": 383, "format": "jpeg" }] }')
     print()
     print("响应格式:")
     print('  {')
@@ -638,12 +1586,28 @@ def main():
     print("按 Ctrl+C 停止服务")
     print("=" * 60)
 
-    server = HTTPServer(('0.0.0.0', port), ImageExtractHandler)
+    watcher = None
+    if WATCH_DIR:
+        global _precompute_cache
+        cache_root = Path(WATCH_CACHE_DIR) if WATCH_CACHE_DIR else Path(tempfile.mkdtemp(prefix='mineru_precompute_'))
+        _precompute_cache = PrecomputeCache(cache_root, max_entries=WATCH_CACHE_SIZE)
+        watcher = PdfFolderWatcher(
+            WATCH_DIR,
+            _precompute_cache,
+            interval=WATCH_INTERVAL,
+            debounce=WATCH_DEBOUNCE,
+            process_existing=WATCH_PROCESS_EXISTING
+        )
+        watcher.start()
+
+    server = create_server(port)
 
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print('\n[INFO] 正在关闭服务...')
+        if watcher is not None:
+            watcher.stop()
         server.shutdown()
         print('[INFO] 服务已停止')
 
@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+"""
+image_extract_service 的单元测试 (无需 MinerU / GPU)
+
+运行:
+    cd scripts
+    python -m pytest -q test_image_extract_service.py
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import socket
+import threading
+import http.client
+
+import pytest
+
+import image_extract_service as service
+
+
+class FakeCache:
+    """记录入队情况的 PrecomputeCache 替身"""
+
+    def __init__(self, known_hashes=()):
+        self.known_hashes = set(known_hashes)
+        self.enqueued = []
+
+    def contains(self, file_hash):
+        return file_hash in self.known_hashes
+
+    def enqueue(self, pdf_path, file_hash):
+        self.enqueued.append((os.path.basename(pdf_path), file_hash))
+
+
+def _write_pdf(path, content=b'%PDF-1.4 test'):
+    path.write_bytes(content)
+    return path
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """用基准测试中的确定性替身代替 MinerU"""
+    pytest.importorskip('fitz')
+    import benchmark_extract_service as bench
+
+    monkeypatch.setattr(service, 'mineru_main', bench.standin_mineru_main)
+    monkeypatch.setattr(service, 'MINERU_AVAILABLE', True)
+    return bench
+
+
+# ---------------------------------------------------------------------------
+# PdfFolderWatcher
+# ---------------------------------------------------------------------------
+
+def test_watcher_ignores_existing_files_on_first_scan(tmp_path):
+    _write_pdf(tmp_path / 'old.pdf')
+    cache = FakeCache()
+    watcher = service.PdfFolderWatcher(str(tmp_path), cache, debounce=10)
+
+    watcher.scan_once(now=0)
+    watcher.scan_once(now=100)
+
+    assert cache.enqueued == []
+
+
+def test_watcher_process_existing_enqueues_after_debounce(tmp_path):
+    _write_pdf(tmp_path / 'old.pdf')
+    cache = FakeCache()
+    watcher = service.PdfFolderWatcher(str(tmp_path), cache, debounce=10, process_existing=True)
+
+    watcher.scan_once(now=0)
+    assert cache.enqueued == []
+    watcher.scan_once(now=11)
+    assert [name for name, _ in cache.enqueued] == ['old.pdf']
+
+
+def test_watcher_debounces_new_and_changed_files(tmp_path):
+    cache = FakeCache()
+    watcher = service.PdfFolderWatcher(str(tmp_path), cache, debounce=10)
+    watcher.scan_once(now=0)
+
+    pdf = _write_pdf(tmp_path / 'new.pdf')
+    watcher.scan_once(now=1)
+    watcher.scan_once(now=5)
+    assert cache.enqueued == []
+
+    # 仍在写入：签名变化后重新计时
+    _write_pdf(pdf, b'%PDF-1.4 test, more bytes')
+    watcher.scan_once(now=8)
+    watcher.scan_once(now=15)
+    assert cache.enqueued == []
+
+    watcher.scan_once(now=19)
+    assert cache.enqueued == [('new.pdf', service.compute_file_hash(str(pdf)))]
+
+    # 已处理且未变化的文件不会再次入队
+    watcher.scan_once(now=100)
+    assert len(cache.enqueued) == 1
+
+
+def test_watcher_skips_cached_hash(tmp_path):
+    cache = FakeCache()
+    watcher = service.PdfFolderWatcher(str(tmp_path), cache, debounce=0)
+    watcher.scan_once(now=0)
+
+    pdf = _write_pdf(tmp_path / 'dup.pdf')
+    cache.known_hashes.add(service.compute_file_hash(str(pdf)))
+    watcher.scan_once(now=1)
+    watcher.scan_once(now=2)
+
+    assert cache.enqueued == []
+
+
+def test_watcher_ignores_non_pdf(tmp_path):
+    cache = FakeCache()
+    watcher = service.PdfFolderWatcher(str(tmp_path), cache, debounce=0)
+    watcher.scan_once(now=0)
+
+    (tmp_path / 'notes.txt').write_text('x')
+    watcher.scan_once(now=1)
+    watcher.scan_once(now=2)
+
+    assert cache.enqueued == []
+
+
+def test_watcher_thread_starts_and_stops(tmp_path):
+    watcher = service.PdfFolderWatcher(str(tmp_path), FakeCache(), interval=0.01)
+    watcher.start()
+    watcher.stop()
+    watcher.join(timeout=5)
+
+    assert not watcher.is_alive()
+
+
+# ---------------------------------------------------------------------------
+# PrecomputeCache
+# ---------------------------------------------------------------------------
+
+def test_cache_reloads_results_from_manifest(tmp_path, standin, monkeypatch):
+    pdf = standin.generate_synthetic_pdf(tmp_path / 'paper.pdf', seed=1, figures=2, references=10, image_size=64)
+    cache_root = tmp_path / 'cache'
+
+    first = service.PrecomputeCache(cache_root)
+    result = first.get_or_extract(str(pdf), str(tmp_path / 'out1'))
+    assert len(result['figures']) == 2
+
+    file_hash = service.compute_file_hash(str(pdf))
+    assert (cache_root / file_hash / service.PrecomputeCache.MANIFEST_NAME).exists()
+
+    # "重启"：新实例从清单恢复，不再调用 MinerU
+    def fail():
+        raise AssertionError("MinerU should not run for a cached PDF")
+
+    monkeypatch.setattr(service, 'mineru_main', fail)
+    second = service.PrecomputeCache(cache_root)
+    assert second.contains(file_hash)
+
+    restored = second.get_or_extract(str(pdf), str(tmp_path / 'out2'))
+    assert [f['filename'] for f in restored['figures']] == [f['filename'] for f in result['figures']]
+    assert [f['base64_data'] for f in restored['figures']] == [f['base64_data'] for f in result['figures']]
+    assert all(f['path'].startswith(str(tmp_path / 'out2')) for f in restored['figures'])
+
+
+def _wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_background_worker_survives_failed_mineru_run(tmp_path, standin, monkeypatch):
+    bad = standin.generate_synthetic_pdf(tmp_path / 'bad.pdf', seed=1, figures=1, references=5, image_size=64)
+    good = standin.generate_synthetic_pdf(tmp_path / 'good.pdf', seed=2, figures=1, references=5, image_size=64)
+
+    def flaky_mineru():
+        if '-p' in sys.argv and sys.argv[sys.argv.index('-p') + 1] == str(bad):
+            raise SystemExit(1)
+        standin.standin_mineru_main()
+
+    monkeypatch.setattr(service, 'mineru_main', flaky_mineru)
+    cache = service.PrecomputeCache(tmp_path / 'cache')
+
+    bad_hash = service.compute_file_hash(str(bad))
+    good_hash = service.compute_file_hash(str(good))
+    cache.enqueue(str(bad), bad_hash)
+    cache.enqueue(str(good), good_hash)
+
+    assert _wait_until(lambda: cache.contains(good_hash) and not cache._in_flight)
+    assert cache._worker.is_alive()
+    assert not cache.contains(bad_hash)
+
+
+def test_nonzero_mineru_exit_raises_runtime_error(tmp_path, monkeypatch):
+    def failing_mineru():
+        raise SystemExit(3)
+
+    monkeypatch.setattr(service, 'mineru_main', failing_mineru)
+    extractor = service.MinerUImageExtractor()
+
+    with pytest.raises(RuntimeError):
+        extractor.parse_pdf_with_mineru(str(tmp_path / 'missing.pdf'))
+    assert not service._MINERU_LOCK.locked()
+
+
+def test_cache_defers_eviction_while_result_is_being_copied(tmp_path):
+    cache = service.PrecomputeCache(tmp_path / 'cache', max_entries=1)
+    empty = {'figures': [], 'first_page': None, 'metadata': {}}
+    for file_hash in ('a', 'b'):
+        (cache.cache_root / file_hash).mkdir()
+
+    with cache._cond:
+        cache._store_locked('a', empty)
+    # 模拟前台请求命中 'a' 后正在复制文件
+    cache._get_or_compute('a.pdf', 'a')
+
+    with cache._cond:
+        cache._store_locked('b', empty)
+    assert not cache.contains('a')
+    assert (cache.cache_root / 'a').exists()
+
+    cache._release('a')
+    assert not (cache.cache_root / 'a').exists()
+    assert (cache.cache_root / 'b').exists()
+
+
+# ---------------------------------------------------------------------------
+# 后台任务让出 MinerU
+# ---------------------------------------------------------------------------
+
+class FakeGate:
+    def __init__(self, busy_checks):
+        self.busy_checks = list(busy_checks)
+        self.waits = 0
+
+    def foreground_busy(self):
+        return self.busy_checks.pop(0) if self.busy_checks else False
+
+    def wait_until_idle(self):
+        self.waits += 1
+
+
+def test_background_extractor_yields_to_foreground():
+    gate = FakeGate([True, False])
+    extractor = service.MinerUImageExtractor(background_gate=gate)
+
+    extractor._acquire_mineru_lock()
+    try:
+        assert gate.waits == 1
+        assert service._MINERU_LOCK.locked()
+    finally:
+        service._MINERU_LOCK.release()
+
+
+def test_foreground_extractor_does_not_consult_gate():
+    extractor = service.MinerUImageExtractor()
+
+    extractor._acquire_mineru_lock()
+    service._MINERU_LOCK.release()
+    assert not service._MINERU_LOCK.locked()
+
+
+# ---------------------------------------------------------------------------
+# HTTP 分帧 (keep-alive)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def server():
+    srv = service.create_server(0, host='127.0.0.1')
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def raw_conn(server):
+    sock = socket.create_connection(server.server_address, timeout=5)
+    yield sock
+    sock.close()
+
+
+def _exchange(sock, raw_request: bytes):
+    """在同一 socket 上发送一个原始请求并读取一个响应"""
+    sock.sendall(raw_request)
+    resp = http.client.HTTPResponse(sock)
+    resp.begin()
+    body = resp.read()
+    return resp, json.loads(body)
+
+
+def _post(body: bytes, extra_headers: str = '') -> bytes:
+    return (
+        f"POST /extract HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n{extra_headers}\r\n"
+    ).encode() + body
+
+
+def test_keepalive_connection_serves_multiple_requests(raw_conn):
+    for _ in range(2):
+        resp, payload = _exchange(raw_conn, _post(b'{}'))
+        assert resp.status == 400
+        assert payload['error'] == 'Missing pdfPath parameter'
+        assert resp.getheader('Content-Length') is not None
+        assert resp.getheader('Connection') != 'close'
+
+
+def test_chunked_request_body_is_decoded(raw_conn):
+    body = b'{"outputDir": "./temp"}'
+    chunked = (
+        b"POST /extract HTTP/1.1\r\nHost: test\r\nTransfer-Encoding: chunked\r\n\r\n"
+        + b"%x\r\n" % 10 + body[:10] + b"\r\n"
+        + b"%x;ext=1\r\n" % (len(body) - 10) + body[10:] + b"\r\n"
+        + b"0\r\n\r\n"
+    )
+    resp, payload = _exchange(raw_conn, chunked)
+    assert resp.status == 400
+    assert payload['error'] == 'Missing pdfPath parameter'
+
+    # chunk 数据已全部读取，同一连接上的下一个请求正常解析
+    resp, payload = _exchange(raw_conn, _post(b'{}'))
+    assert resp.status == 400
+    assert payload['error'] == 'Missing pdfPath parameter'
+
+
+@pytest.mark.parametrize('headers, status', [
+    ('Content-Length: abc\r\n', 400),
+    ('Content-Length: -1\r\n', 400),
+    ('Transfer-Encoding: gzip, chunked\r\n', 501),
+])
+def test_bad_framing_closes_connection(raw_conn, headers, status):
+    request = (
+        f"POST /extract HTTP/1.1\r\nHost: test\r\n{headers}\r\n"
+    ).encode() + b'{"pdfPath": "x.pdf"}'
+    resp, payload = _exchange(raw_conn, request)
+
+    assert resp.status == status
+    assert payload['success'] is False
+    assert resp.getheader('Connection') == 'close'
+    # 服务端已关闭连接，剩余字节不会被当作下一个请求解析
+    assert raw_conn.recv(1024) == b''
+
+
+def test_oversized_body_is_rejected(raw_conn, monkeypatch):
+    monkeypatch.setattr(service, 'MAX_REQUEST_BYTES', 16)
+    resp, payload = _exchange(raw_conn, _post(b'{"pdfPath": "' + b'x' * 64 + b'"}'))
+
+    assert resp.status == 413
+    assert resp.getheader('Connection') == 'close'
+
+
+def test_unknown_path_closes_connection(raw_conn):
+    request = _post(b'{}').replace(b'/extract', b'/nope', 1)
+    resp, payload = _exchange(raw_conn, request)
+
+    assert resp.status == 404
+    assert resp.getheader('Connection') == 'close'
+
+
+# ---------------------------------------------------------------------------
+# 响应压缩
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('gzip', 'gzip'),
+    ('GZIP', 'gzip'),
+    ('gzip;q=0', None),
+    ('identity', None),
+    ('br, gzip;q=0.5', 'gzip'),
+    ('*', 'gzip'),
+    ('*;q=0, gzip', 'gzip'),
+    ('gzip;q=0, *', None),
+    ('deflate, br', None),
+])
+def test_negotiate_encoding_gzip_only(monkeypatch, header, expected):
+    monkeypatch.setattr(service, 'zstandard', None)
+    assert service.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_prefers_zstd_when_available(monkeypatch):
+    monkeypatch.setattr(service, 'zstandard', object())
+
+    assert service.negotiate_encoding('gzip, zstd') == 'zstd'
+    assert service.negotiate_encoding('*') == 'zstd'
+    # 客户端 q 值优先于服务端偏好
+    assert service.negotiate_encoding('zstd;q=0.5, gzip') == 'gzip'
+    assert service.negotiate_encoding('zstd;q=0, gzip;q=0.1') == 'gzip'
+
+
+def test_compress_body_gzip_roundtrip():
+    body = b'{"data": "' + b'a' * 4096 + b'"}'
+    compressed = service.compress_body(body, 'gzip')
+
+    assert gzip.decompress(compressed) == body
+    assert len(compressed) < len(body)
+
+
+def test_compress_body_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        service.compress_body(b'x', 'br')
+
+
+# ---------------------------------------------------------------------------
+# 页面渲染
+# ---------------------------------------------------------------------------
+
+def test_parse_render_outputs_defaults():
+    outputs = service.parse_render_outputs([
+        {'name': 'full'},
+        {'name': 'cover', 'width': 900, 'height': 383, 'format': 'JPEG'},
+    ])
+
+    assert outputs[0]['dpi'] == service.MINERU_DPI
+    assert outputs[0]['format'] == 'png'
+    assert outputs[1]['dpi'] is None
+    assert outputs[1]['fit'] == 'cover'
+    assert outputs[1]['anchor'] == 'top'
+    assert outputs[1]['format'] == 'jpeg'
+    assert outputs[1]['quality'] == 85
+
+
+@pytest.mark.parametrize('specs', [
+    [],
+    'cover',
+    [{'name': '../escape'}],
+    [{'name': 'a'}, {'name': 'a'}],
+    [{'name': 'a', 'format': 'gif'}],
+    [{'name': 'a', 'width': 0}],
+    [{'name': 'a', 'width': 'wide'}],
+    [{'name': 'a', 'dpi': 5000}],
+    [{'name': 'a', 'dpi': service.RENDER_MAX_DPI + 1}],
+    [{'name': 'a', 'width': service.RENDER_MAX_PIXELS + 1}],
+    [{'name': 'a', 'quality': 101}],
+    [{'name': 'a', 'width': 10, 'height': 10, 'fit': 'stretch'}],
+    [{'name': 'a', 'anchor': 'bottom'}],
+])
+def test_parse_render_outputs_rejects_invalid(specs):
+    with pytest.raises(ValueError):
+        service.parse_render_outputs(specs)
+
+
+def _geometry(spec, page_width=612, page_height=792):
+    return service._output_geometry(service.parse_render_outputs([spec])[0], page_width, page_height)
+
+
+def test_output_geometry_cover_crops_to_target():
+    scale, resized, crop = _geometry({'name': 'c', 'width': 900, 'height': 383})
+
+    assert scale == pytest.approx(900 / 612)
+    assert resized[0] == 900 and resized[1] >= 383
+    assert crop == (900, 383)
+
+
+def test_output_geometry_contain_fits_inside():
+    scale, resized, crop = _geometry({'name': 'c', 'width': 900, 'height': 383, 'fit': 'contain'})
+
+    assert scale == pytest.approx(383 / 792)
+    assert resized[0] <= 900 and resized[1] == 383
+    assert crop is None
+
+
+def test_output_geometry_single_dimension_and_dpi():
+    assert _geometry({'name': 't', 'width': 200})[1] == (200, round(792 * 200 / 612))
+    assert _geometry({'name': 't', 'height': 100})[1] == (round(612 * 100 / 792), 100)
+
+    scale, resized, crop = _geometry({'name': 'p', 'dpi': 144})
+    assert scale == pytest.approx(2)
+    assert resized == (1224, 1584)
+    assert crop is None
+
+
+@pytest.fixture
+def rendered_pdf(tmp_path, monkeypatch):
+    pytest.importorskip('fitz')
+    pytest.importorskip('PIL')
+    import benchmark_extract_service as bench
+
+    monkeypatch.setattr(service, '_RENDER_CACHE', service.OrderedDict())
+    return bench.generate_synthetic_pdf(tmp_path / 'paper.pdf', seed=1, figures=1, references=5, image_size=64)
+
+
+def test_render_renders_once_at_largest_output_scale(tmp_path, rendered_pdf):
+    result = service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'out'), [
+        {'name': 'cover', 'width': 900, 'height': 383, 'format': 'jpeg'},
+        {'name': 'thumb', 'width': 200},
+    ])
+
+    assert result['render']['cached'] is False
+    assert result['render']['width'] >= 900
+    assert (result['outputs']['cover']['width'], result['outputs']['cover']['height']) == (900, 383)
+    assert result['outputs']['cover']['mime_type'] == 'image/jpeg'
+    assert (tmp_path / 'out' / 'cover.jpg').exists()
+    assert (tmp_path / 'out' / 'thumb.png').exists()
+
+
+def test_render_output_size_does_not_depend_on_cache(tmp_path, rendered_pdf):
+    spec = [{'name': 'thumb', 'width': 200}]
+    fresh = service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'a'), spec)
+
+    service._RENDER_CACHE.clear()
+    service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'b'), [{'name': 'page', 'dpi': 150}])
+    cached = service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'c'), spec)
+
+    assert cached['render']['cached'] is True
+    size = lambda r: (r['outputs']['thumb']['width'], r['outputs']['thumb']['height'])
+    assert size(fresh) == size(cached)
+
+
+def test_first_page_does_not_fill_render_cache(tmp_path, rendered_pdf):
+    first_page = service.extract_first_page_simple(str(rendered_pdf), str(tmp_path / 'out'), dpi=72)
+
+    assert first_page['filename'] == 'page_1.png'
+    assert first_page['base64_data']
+    assert len(service._RENDER_CACHE) == 0
+
+
+def test_render_cache_is_bounded_by_bitmap_bytes(tmp_path, rendered_pdf, monkeypatch):
+    # 72 DPI 整页位图约 1.3 MB，预算只够缓存一页
+    monkeypatch.setattr(service, 'RENDER_CACHE_MAX_MB', 2)
+    other_pdf = tmp_path / 'other.pdf'
+    other_pdf.write_bytes(rendered_pdf.read_bytes() + b'\n')
+
+    service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'a'), [{'name': 'p', 'dpi': 72}])
+    service.render_page_outputs(str(other_pdf), str(tmp_path / 'b'), [{'name': 'p', 'dpi': 72}])
+
+    assert len(service._RENDER_CACHE) == 1
+    assert next(iter(service._RENDER_CACHE))[0] == service.compute_file_hash(str(other_pdf))
+
+
+def test_render_larger_than_budget_is_not_cached(tmp_path, rendered_pdf, monkeypatch):
+    monkeypatch.setattr(service, 'RENDER_CACHE_MAX_MB', 1)
+    service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'a'), [{'name': 'thumb', 'width': 200}])
+    result = service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'b'), [{'name': 'p', 'dpi': 150}])
+
+    assert result['render']['cached'] is False
+    # 超预算的渲染不写入，也不挤掉已缓存的小渲染
+    assert [e['image'].width for e in service._RENDER_CACHE.values()] == [200]
+
+
+def test_render_rejects_oversized_bitmap(tmp_path, rendered_pdf, monkeypatch):
+    monkeypatch.setattr(service, 'RENDER_MAX_AREA', 1_000_000)
+
+    with pytest.raises(ValueError):
+        service.render_page_outputs(str(rendered_pdf), str(tmp_path / 'a'), [{'name': 'p', 'dpi': 150}])
+    assert len(service._RENDER_CACHE) == 0